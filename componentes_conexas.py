@@ -6,10 +6,144 @@ Provee funcionalidades para detección de regiones, cálculo de propiedades geom
 y generación de visualizaciones con anotaciones.
 """
 
+import math
+import os
+import sys
 import cv2
-from skimage.measure import label, regionprops
-from typing import Tuple, List
+import numpy as np
+from typing import Dict, Tuple
+from image_io import imread_cached
+import mixer
 from mixer import MaskCombiner
+from numba_compat import NUMBA_AVAILABLE, njit
+
+# El etiquetado BBDT de OpenCV procesa franjas de la imagen en paralelo
+cv2.setNumThreads(os.cpu_count() or 1)
+
+LABELING_BACKENDS = ('opencv', 'numba')
+
+# Tabla de propiedades por región: área, caja (min_fila, min_col, max_fila, max_col)
+# y centroide (fila, columna)
+REGION_DTYPE = np.dtype([('area', 'i4'), ('bbox', 'i4', (4,)), ('centroid', 'f4', (2,))])
+
+# Erosión en cruz y códigos de vecindad del perímetro de skimage (neighborhood=4)
+_CROSS_KERNEL = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+_PERIMETER_KERNEL = np.array([[10, 2, 10], [2, 1, 2], [10, 2, 10]], np.float32)
+_PERIMETER_WEIGHTS = np.zeros(50, np.float64)
+_PERIMETER_WEIGHTS[[5, 7, 15, 17, 25, 27]] = 1
+_PERIMETER_WEIGHTS[[21, 33]] = math.sqrt(2)
+_PERIMETER_WEIGHTS[[13, 23]] = (1 + math.sqrt(2)) / 2
+
+
+@njit(cache=True)
+def _find_root(parents: np.ndarray, label: int) -> int:
+    """Busca la raíz de una etiqueta comprimiendo el camino recorrido."""
+    while parents[label] != label:
+        parents[label] = parents[parents[label]]
+        label = parents[label]
+    return label
+
+
+@njit(cache=True)
+def _merge_labels(parents: np.ndarray, current: int, neighbor: int) -> int:
+    """Une la etiqueta actual con la de un vecino y devuelve la raíz resultante."""
+    if neighbor == 0:
+        return current
+    if current == 0:
+        return _find_root(parents, neighbor)
+    root_a = _find_root(parents, current)
+    root_b = _find_root(parents, neighbor)
+    if root_a < root_b:
+        parents[root_b] = root_a
+        return root_a
+    parents[root_a] = root_b
+    return root_b
+
+
+@njit(cache=True)
+def _label_union_find(binary: np.ndarray):
+    """
+    Etiquetado de componentes 8-conexas en dos pasadas con union-find.
+
+    La primera pasada asigna etiquetas provisionales consultando los vecinos ya
+    visitados (O, NO, N, NE) y registra equivalencias; la segunda resuelve las
+    raíces, compacta las etiquetas y acumula las estadísticas.
+
+    Args:
+        binary: Imagen binaria uint8
+
+    Returns:
+        Mismo formato que cv2.connectedComponentsWithStats: número de etiquetas,
+        imagen etiquetada int32, estadísticas int32[n, 5] y centroides float64[n, 2] (x, y)
+    """
+    h, w = binary.shape
+    labels = np.zeros((h, w), np.int32)
+    parents = np.empty(((h + 1) // 2) * ((w + 1) // 2) + 2, np.int32)
+    parents[0] = 0
+    next_label = 1
+
+    for i in range(h):
+        for j in range(w):
+            if binary[i, j] == 0:
+                continue
+            current = 0
+            if j > 0:
+                current = _merge_labels(parents, current, labels[i, j - 1])
+            if i > 0:
+                if j > 0:
+                    current = _merge_labels(parents, current, labels[i - 1, j - 1])
+                current = _merge_labels(parents, current, labels[i - 1, j])
+                if j + 1 < w:
+                    current = _merge_labels(parents, current, labels[i - 1, j + 1])
+            if current == 0:
+                current = next_label
+                parents[next_label] = next_label
+                next_label += 1
+            labels[i, j] = current
+
+    # Las raíces siempre son menores que sus hijos, así que basta una pasada
+    remap = np.zeros(next_label, np.int32)
+    num_labels = 1
+    for label in range(1, next_label):
+        root = _find_root(parents, label)
+        if root == label:
+            remap[label] = num_labels
+            num_labels += 1
+        else:
+            remap[label] = remap[root]
+
+    stats = np.zeros((num_labels, 5), np.int32)
+    stats[:, 0] = w
+    stats[:, 1] = h
+    right = np.full(num_labels, -1, np.int32)
+    bottom = np.full(num_labels, -1, np.int32)
+    sums = np.zeros((num_labels, 2), np.float64)
+
+    for i in range(h):
+        for j in range(w):
+            label = remap[labels[i, j]]
+            labels[i, j] = label
+            stats[label, 4] += 1
+            stats[label, 0] = min(stats[label, 0], j)
+            stats[label, 1] = min(stats[label, 1], i)
+            right[label] = max(right[label], j)
+            bottom[label] = max(bottom[label], i)
+            sums[label, 0] += j
+            sums[label, 1] += i
+
+    centroids = np.zeros((num_labels, 2), np.float64)
+    for label in range(num_labels):
+        area = stats[label, 4]
+        if area > 0:
+            stats[label, 2] = right[label] - stats[label, 0] + 1
+            stats[label, 3] = bottom[label] - stats[label, 1] + 1
+            centroids[label, 0] = sums[label, 0] / area
+            centroids[label, 1] = sums[label, 1] / area
+        else:
+            stats[label, 0] = 0
+            stats[label, 1] = 0
+
+    return num_labels, labels, stats, centroids
 
 
 class ConnectedComponentsAnalyzer:
@@ -19,100 +153,249 @@ class ConnectedComponentsAnalyzer:
     Atributos:
         image_path (str): Ruta de la imagen a procesar
         min_area (int): Área mínima para considerar una región válida
+        backend (str): Implementación del etiquetado ('opencv' o 'numba')
+        regions (np.ndarray): Tabla estructurada REGION_DTYPE con las regiones válidas
     """
 
-    def __init__(self, image_path: str, min_area: int = 10):
+    def __init__(self, image_path: str, min_area: int = 10, backend: str = 'opencv'):
         """
         Inicializa el analizador con parámetros de configuración.
 
         Args:
             image_path: Ruta a la imagen de entrada
             min_area: Área mínima en píxeles para considerar una región (default: 10)
+            backend: Implementación del etiquetado, 'opencv' o 'numba' (default: 'opencv')
         """
+        if backend not in LABELING_BACKENDS:
+            raise ValueError(f"Backend de etiquetado no soportado: {backend}")
+        if backend == 'numba' and not NUMBA_AVAILABLE:
+            raise ImportError("El backend 'numba' requiere tener Numba instalado")
+
         self.image_path = image_path
         self.min_area = min_area
+        self.backend = backend
         self._binary_image = None
-        self._labeled_image = None
-        self.regions = []
+        self._labels = None
+        self._stats = None
+        self._centroids = None
+        self._region_labels = np.empty(0, np.int32)
+        self.regions = np.zeros(0, REGION_DTYPE)
         self._annotated_image = None
 
-    def _load_binary_image(self) -> None:
-        """Carga y procesa la imagen binaria usando el módulo mixer."""
+    def _load_binary_image(self, show: bool = False) -> None:
+        """
+        Carga y procesa la imagen binaria usando el módulo mixer.
+
+        Args:
+            show: Bandera para mostrar la máscara combinada con matplotlib
+        """
         combiner = MaskCombiner(self.image_path)
-        self._binary_image = combiner.combine_masks(True)
+        self._binary_image = combiner.combine_masks(show_combined=show)
 
     def _label_regions(self) -> None:
-        """Etiqueta las regiones en la imagen binaria."""
-        self._labeled_image = label(self._binary_image)
+        """Etiqueta las regiones en la imagen binaria y calcula sus estadísticas."""
+        if self.backend == 'numba':
+            _, self._labels, self._stats, self._centroids = _label_union_find(
+                np.ascontiguousarray(self._binary_image)
+            )
+            return
+
+        _, self._labels, self._stats, self._centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            self._binary_image, 8, cv2.CV_32S, cv2.CCL_BBDT
+        )
 
     def _extract_region_properties(self) -> None:
         """Extrae y filtra propiedades de las regiones detectadas."""
-        self.regions = [
-            region for region in regionprops(self._labeled_image)
-            if region.area >= self.min_area
-        ]
+        # La etiqueta 0 corresponde al fondo
+        keep = np.flatnonzero(self._stats[1:, cv2.CC_STAT_AREA] >= self.min_area) + 1
 
-    def _annotate_image(self) -> None:
-        """Genera imagen anotada con bounding boxes y centroides."""
-        self._annotated_image = cv2.imread(self.image_path)
+        self._region_labels = keep.astype(np.int32)
+        self.regions = np.zeros(keep.size, REGION_DTYPE)
+        if keep.size == 0:
+            return
 
-        for idx, region in enumerate(self.regions):
-            minr, minc, maxr, maxc = region.bbox
-            cy, cx = region.centroid
+        stats = self._stats[keep]
+        left = stats[:, cv2.CC_STAT_LEFT]
+        top = stats[:, cv2.CC_STAT_TOP]
 
-            # Dibujar bounding box
-            cv2.rectangle(
-                self._annotated_image,
-                (minc, minr), (maxc, maxr),
-                (0, 255, 0), 2
-            )
+        self.regions['area'] = stats[:, cv2.CC_STAT_AREA]
+        self.regions['bbox'] = np.column_stack((
+            top, left,
+            top + stats[:, cv2.CC_STAT_HEIGHT],
+            left + stats[:, cv2.CC_STAT_WIDTH]
+        ))
+        self.regions['centroid'] = self._centroids[keep, ::-1]
 
-            # Dibujar centroide
-            cv2.circle(
-                self._annotated_image,
-                (int(cx), int(cy)), 5,
-                (0, 0, 255), -1
-            )
+    def _shape_descriptors(self, idx: int) -> Dict[str, float]:
+        """
+        Calcula descriptores de forma de una región a partir de su recorte etiquetado.
+
+        Args:
+            idx: Índice de la región en la tabla de propiedades
 
-            # Añadir etiqueta numérica
+        Returns:
+            Diccionario con perímetro, solidez, orientación y ejes de la elipse equivalente
+        """
+        minr, minc, maxr, maxc = self.regions['bbox'][idx]
+        roi = (self._labels[minr:maxr, minc:maxc] == self._region_labels[idx]).astype(np.uint8)
+
+        perimeter = self._perimeter(roi)
+
+        contours, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        hull_area = self._convex_area(np.vstack(contours).reshape(-1, 2), roi.shape)
+
+        # Momentos centrales normalizados (misma convención que skimage)
+        m = cv2.moments(roi, binaryImage=True)
+        a = m['mu20'] / m['m00']
+        b = m['mu11'] / m['m00']
+        c = m['mu02'] / m['m00']
+        if a == c:
+            orientation = -math.pi / 4 if b > 0 else math.pi / 4
+        else:
+            orientation = 0.5 * math.atan2(2 * b, c - a)
+        spread = math.sqrt(((a - c) / 2) ** 2 + b ** 2)
+        major = 4 * math.sqrt(max((a + c) / 2 + spread, 0.0))
+        minor = 4 * math.sqrt(max((a + c) / 2 - spread, 0.0))
+
+        return {
+            'perimeter': perimeter,
+            'solidity': self.regions['area'][idx] / hull_area if hull_area > 0 else 1.0,
+            'orientation': orientation,
+            'major_axis_length': major,
+            'minor_axis_length': minor,
+        }
+
+    @staticmethod
+    def _perimeter(roi: np.ndarray) -> float:
+        """
+        Estima el perímetro de la región, como perimeter de skimage.
+
+        Los píxeles del borde (los que la erosión en cruz elimina, incluidos los
+        de los huecos) se ponderan según la configuración de sus vecinos.
+
+        Args:
+            roi: Recorte binario uint8 (0/1) de la región
+
+        Returns:
+            Perímetro estimado en píxeles
+        """
+        eroded = cv2.erode(roi, _CROSS_KERNEL, borderType=cv2.BORDER_CONSTANT, borderValue=0)
+        border = roi - eroded
+        codes = cv2.filter2D(border, cv2.CV_8U, _PERIMETER_KERNEL, borderType=cv2.BORDER_CONSTANT)
+        return float(_PERIMETER_WEIGHTS[codes].sum())
+
+    @staticmethod
+    def _convex_area(points: np.ndarray, shape: Tuple[int, int]) -> int:
+        """
+        Cuenta los píxeles de la envolvente convexa, como convex_area de skimage.
+
+        La envolvente se calcula sobre los puntos medios de los lados de cada
+        píxel del contorno y se cuentan los centros de píxel dentro o sobre ella.
+
+        Args:
+            points: Puntos (x, y) del contorno externo de la región
+            shape: Forma (alto, ancho) del recorte de la región
+
+        Returns:
+            Número de píxeles de la envolvente convexa
+        """
+        offsets = np.array([[-0.5, 0], [0.5, 0], [0, -0.5], [0, 0.5]], np.float32)
+        corners = (points[:, None, :].astype(np.float32) + offsets).reshape(-1, 2)
+        hull = cv2.convexHull(corners).reshape(-1, 2).astype(np.float64)
+        if len(hull) < 3:
+            return len(points)
+
+        # Un centro pertenece a la envolvente si queda del lado interior de todas sus aristas
+        ys, xs = np.mgrid[:shape[0], :shape[1]]
+        sign = 1.0 if cv2.contourArea(hull.astype(np.float32), oriented=True) > 0 else -1.0
+        inside = np.ones(shape, bool)
+        for (x0, y0), (x1, y1) in zip(hull, np.roll(hull, -1, axis=0)):
+            inside &= sign * ((x1 - x0) * (ys - y0) - (y1 - y0) * (xs - x0)) >= -1e-9
+        return int(np.count_nonzero(inside))
+
+    def _annotate_image(self, numbered: bool = False) -> None:
+        """
+        Genera imagen anotada con bounding boxes y centroides.
+
+        Args:
+            numbered: Bandera para rotular cada región con su número en las estadísticas impresas
+        """
+        self._annotated_image = imread_cached(self.image_path).copy()
+
+        if not self.regions.size:
+            return
+
+        # Dibujar todas las bounding boxes en una sola llamada
+        minr, minc, maxr, maxc = self.regions['bbox'].T
+        rectangles = np.stack((
+            np.column_stack((minc, minr)),
+            np.column_stack((maxc, minr)),
+            np.column_stack((maxc, maxr)),
+            np.column_stack((minc, maxr))
+        ), axis=1).astype(np.int32)
+        cv2.polylines(self._annotated_image, rectangles, True, (0, 255, 0), 2)
+
+        # Dibujar centroides; los números solo tienen sentido junto a las estadísticas
+        centers = self.regions['centroid'][:, ::-1].astype(np.int32)
+        for idx, (cx, cy) in enumerate(centers.tolist()):
+            cv2.circle(self._annotated_image, (cx, cy), 5, (0, 0, 255), -1)
+            if not numbered:
+                continue
             cv2.putText(
                 self._annotated_image,
                 str(idx + 1),
-                (int(cx + 4), int(cy + 4)),
+                (cx + 4, cy + 4),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.5, (255, 0, 0), 2
             )
 
-    def analyze(self) -> Tuple[cv2.Mat, List[regionprops]]:
+    def analyze(self, verbose: bool = False, show: bool = False) -> Tuple[np.ndarray, np.ndarray]:
         """
         Ejecuta el pipeline completo de análisis.
 
+        Args:
+            verbose: Bandera para imprimir las estadísticas de cada región
+            show: Bandera para mostrar la máscara combinada con matplotlib
+
         Returns:
             Tuple con:
                 - Imagen anotada con las regiones detectadas
-                - Lista de propiedades de las regiones
+                - Tabla estructurada (REGION_DTYPE) con área, caja y centroide de cada región
         """
-        self._load_binary_image()
+        self._load_binary_image(show)
         self._label_regions()
         self._extract_region_properties()
-        self._annotate_image()
-        self._print_region_stats()
+        self._annotate_image(numbered=verbose)
+        if verbose:
+            self._print_region_stats()
         return self._annotated_image, self.regions
 
     def _print_region_stats(self) -> None:
         """Imprime estadísticas detalladas de cada región."""
-        for idx, region in enumerate(self.regions):
-            print(f"\n--- Objeto {idx + 1} ---")
-            print(f"Área: {region.area}")
-            print(f"Perímetro: {region.perimeter:.2f}")
-            print(f"Centroide: {region.centroid}")
-            print(f"BBox: {region.bbox}")
-            print(f"Relación aspecto: {region.bbox_area / region.area:.2f}")
-            print(f"Extensión: {region.extent:.2f}")
-            print(f"Solidez: {region.solidity:.2f}")
-            print(f"Orientación: {region.orientation:.2f} rad")
-            print(f"Ejes elipse: Mayor={region.major_axis_length:.2f}, Menor={region.minor_axis_length:.2f}")
-    
+        lines = []
+        fields = (self.regions['area'].tolist(), self.regions['bbox'].tolist(), self.regions['centroid'].tolist())
+        for idx, (area, bbox, centroid) in enumerate(zip(*fields)):
+            minr, minc, maxr, maxc = bbox
+            bbox_area = (maxr - minr) * (maxc - minc)
+            shape = self._shape_descriptors(idx)
+
+            lines.extend((
+                f"\n--- Objeto {idx + 1} ---",
+                f"Área: {area}",
+                f"Perímetro: {shape['perimeter']:.2f}",
+                f"Centroide: {tuple(centroid)}",
+                f"BBox: {tuple(bbox)}",
+                f"Relación aspecto: {bbox_area / area:.2f}",
+                f"Extensión: {area / bbox_area:.2f}",
+                f"Solidez: {shape['solidity']:.2f}",
+                f"Orientación: {shape['orientation']:.2f} rad",
+                f"Ejes elipse: Mayor={shape['major_axis_length']:.2f}, Menor={shape['minor_axis_length']:.2f}"
+            ))
+
+        # Una sola escritura en lugar de una llamada a print por línea
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+
     def save_results(self, output_path: str = 'figuras_detectadas_.jpg') -> None:
         """
         Guarda la imagen anotada en disco.
@@ -127,8 +410,9 @@ class ConnectedComponentsAnalyzer:
 
 def main():
     """Función de demostración del módulo."""
+    mixer.warmup()
     analyzer = ConnectedComponentsAnalyzer('imagenes/img_4.jpg')
-    annotated_img, regions = analyzer.analyze()
+    annotated_img, _ = analyzer.analyze(verbose=True, show=True)
     analyzer.save_results()
 
     cv2.imshow('Resultado', annotated_img)
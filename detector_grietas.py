@@ -5,10 +5,89 @@ Combina técnicas de preprocesamiento, detección de bordes y extracción de car
 para identificar posibles áreas dañadas.
 """
 
+import os
 import cv2
 import numpy as np
-from matplotlib import pyplot as plt
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from numba_compat import NUMBA_AVAILABLE, njit, prange
+from image_io import imread_cached
+
+
+def _build_log_tables() -> np.ndarray:
+    """
+    Construye la tabla de la transformación logarítmica para cada intensidad máxima.
+
+    La fila m contiene log(v + 1) / log(m + 1) * 255 calculado en float16, la
+    misma precisión con la que NumPy evalúa np.log sobre imágenes uint8, de modo
+    que el resultado coincide con la transformación aplicada píxel a píxel.
+
+    Returns:
+        Matriz uint8 de 256x256 indexada por (máximo, nivel de gris)
+    """
+    levels = np.log(np.arange(1, 257, dtype=np.float16))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tables = levels[None, :] / levels[:, None] * np.float16(255)
+    # Solo se usan los niveles hasta el máximo; una imagen negra queda en cero
+    tables[~np.tri(256, dtype=bool)] = 0
+    tables[0] = 0
+    return tables.astype(np.uint8)
+
+
+# Tablas de la transformación logarítmica, una fila por intensidad máxima
+_LOG_TABLES = _build_log_tables()
+
+# Filas extra que comparte cada franja con sus vecinas (radio 2 del bilateral d=4)
+_STRIP_HALO = 2
+# Altura mínima de imagen para dividir el filtrado bilateral en franjas
+_MIN_STRIP_ROWS = 256
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _blur_log(gray: np.ndarray, log_tables: np.ndarray, out: np.ndarray) -> None:
+    """
+    Suavizado de caja 3x3 y transformación logarítmica fusionados.
+
+    Reproduce cv2.blur (borde reflejado 101) seguido de la transformación
+    logarítmica normalizada por el máximo de la imagen suavizada.
+
+    Args:
+        gray: Imagen uint8 en escala de grises
+        log_tables: Tablas de la transformación logarítmica (_LOG_TABLES)
+        out: Imagen uint8 de salida con la misma forma que gray
+    """
+    h, w = gray.shape
+    row_max = np.zeros(h, np.int32)
+
+    for i in prange(h):
+        up = i - 1 if i > 0 else min(1, h - 1)
+        down = i + 1 if i < h - 1 else max(h - 2, 0)
+        for j in range(w):
+            left = j - 1 if j > 0 else min(1, w - 1)
+            right = j + 1 if j < w - 1 else max(w - 2, 0)
+            total = (
+                np.int32(gray[up, left]) + np.int32(gray[up, j]) + np.int32(gray[up, right])
+                + np.int32(gray[i, left]) + np.int32(gray[i, j]) + np.int32(gray[i, right])
+                + np.int32(gray[down, left]) + np.int32(gray[down, j]) + np.int32(gray[down, right])
+            )
+            value = (total + 4) // 9
+            out[i, j] = value
+            if value > row_max[i]:
+                row_max[i] = value
+
+    lut = log_tables[row_max.max()]
+
+    for i in prange(h):
+        for j in range(w):
+            out[i, j] = lut[out[i, j]]
+
+
+def _cuda_available() -> bool:
+    """Indica si OpenCV tiene soporte CUDA y hay al menos un dispositivo disponible."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
 
 
 class CrackDetectionPipeline:
@@ -18,64 +97,137 @@ class CrackDetectionPipeline:
     Atributos:
         image_path (str): Ruta de la imagen a analizar
         orb_features (int): Número de características ORB a detectar
+        use_cuda (bool): Indica si el filtrado, Canny y ORB se ejecutan en GPU
+        n_threads (int): Número de franjas del filtrado bilateral procesadas en paralelo en CPU
     """
 
-    def __init__(self, image_path: str, orb_features: int = 1500):
+    def __init__(self, image_path: str, orb_features: int = 1500, use_cuda: bool = False,
+                 n_threads: Optional[int] = None):
         """
         Inicializa el pipeline con parámetros de configuración.
 
         Args:
             image_path: Ruta a la imagen de entrada
             orb_features: Cantidad máxima de características ORB (default: 1500)
+            use_cuda: Usa los módulos cv2.cuda si hay un dispositivo disponible (default: False)
+            n_threads: Franjas paralelas para el filtrado bilateral (default: hasta 4 según los núcleos)
         """
         self.image_path = image_path
         self.orb_features = orb_features
+        self.use_cuda = use_cuda and _cuda_available()
+        self.n_threads = n_threads if n_threads is not None else min(4, os.cpu_count() or 1)
+        self._stream = cv2.cuda_Stream() if self.use_cuda else None
         self.original_image = None
         self.gray_image = None
         self.edges = None
         self.keypoints = None
         self.descriptors = None
         self.features_image = None
+        self._dilate_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (22, 22))
+        self._erode_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (8, 8))
 
     def _load_image(self) -> None:
-        """Carga y convierte la imagen a escala de grises."""
-        self.original_image = cv2.imread(self.image_path)
-        if self.original_image is None:
-            raise FileNotFoundError(f"Imagen no encontrada: {self.image_path}")
-        self.gray_image = cv2.cvtColor(self.original_image, cv2.COLOR_BGR2GRAY)
+        """Carga la imagen directamente en escala de grises."""
+        self.gray_image = imread_cached(self.image_path, cv2.IMREAD_GRAYSCALE)
 
     def _preprocess_image(self) -> None:
         """Aplica secuencia de preprocesamiento para realzar características."""
-        blurred = cv2.blur(self.gray_image, (3, 3))
-        log_transformed = self._apply_log_transform(blurred)
+        if NUMBA_AVAILABLE:
+            log_transformed = np.empty_like(self.gray_image)
+            _blur_log(self.gray_image, _LOG_TABLES, log_transformed)
+        else:
+            blurred = cv2.blur(self.gray_image, (3, 3))
+            log_transformed = self._apply_log_transform(blurred)
         self.edges = self._enhance_edges(log_transformed)
 
     def _apply_log_transform(self, image: np.ndarray) -> np.ndarray:
         """Aplica transformación logarítmica para mejorar el contraste."""
-        normalized = (np.log(image + 1) / np.log(1 + np.max(image))) * 255
-        return normalized.astype(np.uint8)
+        return cv2.LUT(image, _LOG_TABLES[int(image.max())])
 
     def _enhance_edges(self, image: np.ndarray) -> np.ndarray:
         """Realza bordes usando filtrado bilateral y detección Canny."""
-        bilateral = cv2.bilateralFilter(image, 4, 90, 90)
-        return cv2.Canny(bilateral, 82, 172)
+        if self.use_cuda:
+            return self._enhance_edges_cuda(image)
+        return cv2.Canny(self._bilateral_filter(image), 82, 172)
+
+    def _bilateral_filter(self, image: np.ndarray) -> np.ndarray:
+        """
+        Aplica el filtro bilateral, dividiendo la imagen en franjas paralelas.
+
+        El filtro solo depende de los vecinos dentro de su radio, por lo que las
+        franjas con halo reproducen exactamente el resultado de una sola llamada.
+        Canny no se divide: la histéresis sigue bordes débiles sin límite de filas
+        y OpenCV ya la paraleliza internamente.
+        """
+        rows = image.shape[0]
+        if self.n_threads < 2 or rows < _MIN_STRIP_ROWS:
+            return cv2.bilateralFilter(image, 4, 90, 90)
+
+        def bilateral(start: int, stop: int) -> np.ndarray:
+            top = max(start - _STRIP_HALO, 0)
+            bottom = min(stop + _STRIP_HALO, rows)
+            return cv2.bilateralFilter(image[top:bottom], 4, 90, 90)[start - top:stop - top]
+
+        # OpenCV libera el GIL, por lo que las franjas se procesan en paralelo
+        bounds = np.linspace(0, rows, self.n_threads + 1).astype(int).tolist()
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            strips = list(executor.map(bilateral, bounds[:-1], bounds[1:]))
+        return np.vstack(strips)
+
+    def _enhance_edges_cuda(self, image: np.ndarray) -> np.ndarray:
+        """Realza bordes en GPU encolando carga, filtrado, Canny y descarga en un stream."""
+        gpu_image = cv2.cuda_GpuMat()
+        gpu_image.upload(image, self._stream)
+        gpu_bilateral = cv2.cuda.bilateralFilter(gpu_image, 4, 90, 90, stream=self._stream)
+        canny = cv2.cuda.createCannyEdgeDetector(82, 172)
+        gpu_edges = canny.detect(gpu_bilateral, stream=self._stream)
+        edges = gpu_edges.download(self._stream)
+        self._stream.waitForCompletion()
+        return edges
 
     def _apply_morphology(self) -> None:
-        """Mejora la conectividad de bordes con operaciones morfológicas."""
-        kernel = np.ones((8, 8), np.uint8)
-        self.edges = cv2.dilate(self.edges, kernel, iterations=2)
-        self.edges = cv2.morphologyEx(self.edges, cv2.MORPH_CLOSE, kernel)
+        """
+        Mejora la conectividad de bordes con operaciones morfológicas.
+
+        Equivale a dilatar dos veces con un kernel 8x8 y luego aplicar un cierre
+        8x8: las tres dilataciones se combinan en una sola de 22x22 con el ancla
+        desplazada, seguida de una erosión 8x8.
+        """
+        self.edges = cv2.dilate(self.edges, self._dilate_kernel, anchor=(12, 12))
+        self.edges = cv2.erode(self.edges, self._erode_kernel)
 
     def _detect_orb_features(self) -> None:
         """Detecta características ORB en los bordes procesados."""
-        orb = cv2.ORB_create(nfeatures=self.orb_features)
-        self.keypoints, self.descriptors = orb.detectAndCompute(self.edges, None)
+        if self.use_cuda:
+            self._detect_orb_features_cuda()
+        else:
+            orb = cv2.ORB_create(nfeatures=self.orb_features)
+            self.keypoints, self.descriptors = orb.detectAndCompute(self.edges, None)
         self.features_image = cv2.drawKeypoints(
             self.edges, self.keypoints, None, flags=cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS
         )
 
+    def _detect_orb_features_cuda(self) -> None:
+        """Detecta características ORB en GPU y descarga puntos clave y descriptores."""
+        gpu_edges = cv2.cuda_GpuMat()
+        gpu_edges.upload(self.edges, self._stream)
+        orb = cv2.cuda_ORB.create(nfeatures=self.orb_features)
+        gpu_keypoints, gpu_descriptors = orb.detectAndComputeAsync(
+            gpu_edges, cv2.cuda_GpuMat(), stream=self._stream
+        )
+        self._stream.waitForCompletion()
+        self.keypoints = orb.convert(gpu_keypoints)
+        self.descriptors = gpu_descriptors.download()
+
     def _display_results(self) -> None:
         """Muestra resultados del proceso de detección."""
+        # matplotlib solo se importa cuando se visualiza
+        from matplotlib import pyplot as plt
+
+        # La imagen a color solo se decodifica para visualizarla
+        if self.original_image is None:
+            self.original_image = imread_cached(self.image_path)
+
         plt.figure(figsize=(10, 5))
 
         plt.subplot(1, 2, 1)
@@ -91,10 +243,13 @@ class CrackDetectionPipeline:
         plt.tight_layout()
         plt.show()
 
-    def execute(self) -> np.ndarray:
+    def execute(self, show: bool = False) -> np.ndarray:
         """
         Ejecuta el pipeline completo de detección.
 
+        Args:
+            show: Bandera para mostrar los resultados con matplotlib
+
         Returns:
             Imagen binaria con bordes detectados
         """
@@ -102,15 +257,26 @@ class CrackDetectionPipeline:
         self._preprocess_image()
         self._apply_morphology()
         self._detect_orb_features()
-        self._display_results()
+        if show:
+            self._display_results()
         return self.edges
 
 
+def warmup() -> None:
+    """Compila por adelantado los núcleos de Numba del módulo con una imagen sintética."""
+    if NUMBA_AVAILABLE:
+        # Las imágenes reales llegan de solo lectura desde la caché de imágenes
+        image = np.zeros((32, 32), np.uint8)
+        image.setflags(write=False)
+        _blur_log(image, _LOG_TABLES, np.empty_like(image))
+
+
 def main():
     """Función de demostración del módulo."""
+    warmup()
     detector = CrackDetectionPipeline('imagenes/img_4.jpg')
-    _ = detector.execute()
+    _ = detector.execute(show=True)
 
 
-if __name__ == '_main_':
+if __name__ == '__main__':
     main()
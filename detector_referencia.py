@@ -7,8 +7,8 @@ de mayor área en una imagen, útil para calibración de escalas.
 
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Optional, Tuple
+from image_io import imread_cached
 
 
 class WhiteRegionDetector:
@@ -18,62 +18,120 @@ class WhiteRegionDetector:
     Atributos:
         image_path (str): Ruta de la imagen a procesar
         threshold (int): Umbral de binarización (0-255)
-        original_image (np.ndarray): Imagen original cargada
-        binary_image (np.ndarray): Imagen binarizada
-        largest_contour (np.ndarray): Contorno de la región detectada
+        downscale (int): Factor de reducción usado para localizar la región
+        gray_image (np.ndarray): Imagen cargada en escala de grises
+        binary_image (np.ndarray): Imagen reducida binarizada
+        bounding_box (Tuple[int, int, int, int]): Caja (x, y, ancho, alto) de la región detectada
         mask (np.ndarray): Máscara binaria de la región
     """
 
-    def __init__(self, image_path: str, threshold: int = 150):
+    def __init__(self, image_path: str, threshold: int = 150, downscale: int = 1):
         """
         Inicializa el detector con parámetros de configuración.
 
         Args:
             image_path: Ruta a la imagen de entrada
             threshold: Valor de umbral para binarización (default: 150)
+            downscale: Factor de reducción para la búsqueda inicial, 1 la desactiva (default: 1).
+                Solo se activa a petición: con factores mayores, las regiones finas que
+                se pierden al reducir pueden hacer que se elija otra región como la de
+                mayor área. Se ignora en imágenes menores que dos veces el factor
         """
         self.image_path = image_path
         self.threshold = threshold
-        self.original_image = None
+        self.downscale = max(int(downscale), 1)
+        self._scale = 1
         self.gray_image = None
         self.binary_image = None
-        self.largest_contour = None
+        self.bounding_box = None
         self.mask = None
 
     def _load_image(self) -> None:
-        """Carga y convierte la imagen a escala de grises."""
-        self.original_image = cv2.imread(self.image_path)
-        if self.original_image is None:
-            raise FileNotFoundError(f"Imagen no encontrada: {self.image_path}")
-        self.gray_image = cv2.cvtColor(self.original_image, cv2.COLOR_BGR2GRAY)
+        """Carga la imagen directamente en escala de grises."""
+        self.gray_image = imread_cached(self.image_path, cv2.IMREAD_GRAYSCALE)
 
     def _binarize_image(self) -> None:
-        """Aplica umbralización para obtener imagen binaria."""
+        """Aplica umbralización sobre la imagen reducida para obtener imagen binaria."""
+        small = self.gray_image
+        # Una imagen demasiado pequeña quedaría vacía al reducirla
+        self._scale = self.downscale if min(small.shape[:2]) >= 2 * self.downscale else 1
+        if self._scale > 1:
+            factor = 1.0 / self._scale
+            small = cv2.resize(
+                self.gray_image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+            )
         _, self.binary_image = cv2.threshold(
-            self.gray_image, self.threshold, 255, cv2.THRESH_BINARY
+            small, self.threshold, 255, cv2.THRESH_BINARY
         )
 
-    def _find_largest_contour(self) -> None:
-        """Identifica el contorno de mayor área en la imagen binaria."""
-        contours, _ = cv2.findContours(
-            self.binary_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
+    @staticmethod
+    def _largest_component(binary: np.ndarray) -> Tuple[np.ndarray, int, Tuple[int, int, int, int]]:
+        """
+        Etiqueta la imagen binaria y localiza la componente de mayor área.
 
-        if not contours:
-            raise ValueError("No se encontraron contornos en la imagen")
+        Args:
+            binary: Imagen binaria a etiquetar
+
+        Returns:
+            Tupla con la imagen etiquetada, la etiqueta de la componente y su caja (x, y, ancho, alto)
+        """
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+            binary, connectivity=8, ltype=cv2.CV_32S
+        )
 
-        self.largest_contour = max(contours, key=cv2.contourArea)
-        self._create_mask()
+        if num_labels < 2:
+            raise ValueError("No se encontraron regiones en la imagen")
 
-    def _create_mask(self) -> None:
-        """Genera máscara binaria del área detectada."""
-        self.mask = np.zeros_like(self.binary_image)
-        cv2.drawContours(
-            self.mask, [self.largest_contour], -1, 255, thickness=cv2.FILLED
+        # La etiqueta 0 corresponde al fondo
+        idx = 1 + int(stats[1:, cv2.CC_STAT_AREA].argmax())
+        x, y, w, h = (
+            int(v) for v in stats[idx, [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP,
+                                        cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT]]
         )
+        return labels, idx, (x, y, w, h)
+
+    def _find_largest_region(self) -> None:
+        """Identifica la región blanca de mayor área en la imagen binaria."""
+        labels, idx, (x, y, w, h) = self._largest_component(self.binary_image)
+        x0, y0 = 0, 0
+
+        if self._scale > 1:
+            # Refinar a resolución completa solo dentro de la caja escalada
+            s = self._scale
+            rows, cols = self.gray_image.shape
+            x0, y0 = max((x - 1) * s, 0), max((y - 1) * s, 0)
+            x1, y1 = min((x + w + 1) * s, cols), min((y + h + 1) * s, rows)
+            _, roi_binary = cv2.threshold(
+                self.gray_image[y0:y1, x0:x1], self.threshold, 255, cv2.THRESH_BINARY
+            )
+            labels, idx, (x, y, w, h) = self._largest_component(roi_binary)
+
+            # Si la región toca un borde de la ventana que no es borde de la imagen,
+            # continúa fuera de ella: se repite la búsqueda a resolución completa
+            if ((x == 0 and x0 > 0) or (y == 0 and y0 > 0)
+                    or (x + w == x1 - x0 and x1 < cols) or (y + h == y1 - y0 and y1 < rows)):
+                _, full_binary = cv2.threshold(
+                    self.gray_image, self.threshold, 255, cv2.THRESH_BINARY
+                )
+                labels, idx, (x, y, w, h) = self._largest_component(full_binary)
+                x0, y0 = 0, 0
+
+        self.bounding_box = (x + x0, y + y0, w, h)
+
+        # Rellenar los huecos interiores de la región dentro de su caja, igual
+        # que el relleno de su contorno externo
+        region = np.zeros((h + 2, w + 2), np.uint8)
+        region[1:-1, 1:-1][labels[y:y + h, x:x + w] == idx] = 255
+        cv2.floodFill(region, None, (0, 0), 128)
+
+        self.mask = np.zeros_like(self.gray_image)
+        self.mask[y0 + y:y0 + y + h, x0 + x:x0 + x + w][region[1:-1, 1:-1] != 128] = 255
 
     def _display_results(self) -> None:
         """Muestra resultados intermedios usando matplotlib."""
+        # matplotlib solo se importa cuando se visualiza
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(12, 4))
 
         plt.subplot(1, 3, 1)
@@ -94,17 +152,21 @@ class WhiteRegionDetector:
         plt.tight_layout()
         plt.show()
 
-    def process(self) -> np.ndarray:
+    def process(self, show: bool = False) -> np.ndarray:
         """
         Ejecuta el pipeline completo de procesamiento.
 
+        Args:
+            show: Bandera para mostrar los resultados intermedios con matplotlib
+
         Returns:
             Máscara binaria de la región detectada
         """
         self._load_image()
         self._binarize_image()
-        self._find_largest_contour()
-        self._display_results()
+        self._find_largest_region()
+        if show:
+            self._display_results()
         return self.mask
 
     def get_bounding_box(self) -> Optional[Tuple[int, int, int, int]]:
@@ -114,15 +176,13 @@ class WhiteRegionDetector:
         Returns:
             Tupla (x, y, ancho, alto) o None si no hay detección
         """
-        if self.largest_contour is not None:
-            return cv2.boundingRect(self.largest_contour)
-        return None
+        return self.bounding_box
 
 
 def main():
     """Función de demostración del módulo."""
     detector = WhiteRegionDetector('imagenes/img_1.jpg', threshold=150)
-    detector.process()
+    detector.process(show=True)
 
     bbox = detector.get_bounding_box()
     if bbox:
@@ -130,5 +190,5 @@ def main():
         print(f"Región de referencia detectada en: x={x}, y={y}, ancho={w}, alto={h}")
 
 
-if __name__ == '_main_':
+if __name__ == '__main__':
     main()
\ No newline at end of file
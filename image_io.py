@@ -0,0 +1,42 @@
+"""
+Módulo de lectura de imágenes con caché compartida.
+
+Evita decodificar varias veces la misma imagen cuando distintos detectores del
+pipeline trabajan sobre la misma ruta.
+"""
+
+import functools
+import os
+import cv2
+import numpy as np
+
+
+def imread_cached(image_path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """
+    Lee una imagen reutilizando la decodificación previa si el archivo no cambió.
+
+    La imagen devuelta es de solo lectura y compartida entre consumidores; quien
+    necesite dibujar sobre ella debe trabajar sobre una copia.
+
+    Args:
+        image_path: Ruta a la imagen de entrada
+        flags: Modo de lectura de OpenCV (default: cv2.IMREAD_COLOR)
+
+    Returns:
+        Imagen decodificada de solo lectura
+    """
+    try:
+        mtime = os.path.getmtime(image_path)
+    except OSError:
+        raise FileNotFoundError(f"Imagen no encontrada: {image_path}") from None
+    return _read_image(image_path, mtime, flags)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_image(image_path: str, mtime: float, flags: int) -> np.ndarray:
+    """Decodifica la imagen; la fecha de modificación forma parte de la clave de caché."""
+    image = cv2.imread(image_path, flags)
+    if image is None:
+        raise FileNotFoundError(f"Imagen no encontrada: {image_path}")
+    image.setflags(write=False)
+    return image
@@ -5,9 +5,18 @@ Calcula métricas de salud basado en detección de grietas y referencia de escal
 optimizado para evitar ejecuciones duplicadas.
 """
 
+import hashlib
+import os
 import cv2
+import numpy as np
+from typing import Optional, Tuple
 from componentes_conexas import ConnectedComponentsAnalyzer
-from skimage.measure import regionprops
+from image_io import imread_cached
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'structural')
+# Versión de los resultados en caché; incrementarla al cambiar detectores, sus
+# parámetros o el formato del archivo para invalidar análisis anteriores
+CACHE_VERSION = 2
 
 
 class StructuralHealthAnalyzer:
@@ -18,9 +27,11 @@ class StructuralHealthAnalyzer:
         image_path (str): Ruta de la imagen a analizar
         reference_width (float): Ancho real de referencia en cm
         reference_height (float): Alto real de referencia en cm
+        cache_dir (Optional[str]): Directorio de caché del análisis entre ejecuciones
     """
 
-    def __init__(self, image_path: str, reference_width: float = 26.0, reference_height: float = 36.0):
+    def __init__(self, image_path: str, reference_width: float = 26.0, reference_height: float = 36.0,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
         """
         Inicializa el analizador y componentes necesarios.
 
@@ -28,33 +39,100 @@ class StructuralHealthAnalyzer:
             image_path: Ruta a la imagen de la pared
             reference_width: Ancho real de referencia en cm (default: 26)
             reference_height: Alto real de referencia en cm (default: 36)
+            cache_dir: Directorio de caché en disco, None para desactivarla (default: ~/.cache/structural)
         """
         self.image_path = image_path
         self.reference_width = reference_width
         self.reference_height = reference_height
+        self.cache_dir = cache_dir
         self._wall_image = None
         self._components_analyzer = ConnectedComponentsAnalyzer(image_path)
-        self._regions = None
-        self._reference_component = None
+        self._analysis_key = None
+        self._areas = None
+        self._reference_index = None
+        self._reference_bbox = None
+        self._reference_centroid = None
         self._conversion_factor = None
         self._total_wall_area = None
         self._damaged_areas = []
 
     def _load_wall_image(self) -> None:
         """Carga la imagen y valida su existencia."""
-        self._wall_image = cv2.imread(self.image_path)
-        if self._wall_image is None:
-            raise FileNotFoundError(f"Imagen no encontrada: {self.image_path}")
+        self._wall_image = imread_cached(self.image_path, cv2.IMREAD_GRAYSCALE)
 
     def _execute_single_analysis(self) -> None:
         """Ejecuta el análisis de componentes conexas una sola vez."""
-        _, self._regions = self._components_analyzer.analyze()
-        self._reference_component = max(self._regions, key=lambda r: r.area)
+        _, regions = self._components_analyzer.analyze()
+        if not regions.size:
+            raise ValueError("No se detectaron regiones en la imagen")
+        self._areas = regions['area']
+        self._reference_index = int(self._areas.argmax())
+        self._reference_bbox = regions['bbox'][self._reference_index]
+        self._reference_centroid = regions['centroid'][self._reference_index]
+
+    def _get_analysis_key(self) -> Tuple[str, float]:
+        """Clave que identifica la versión actual de la imagen analizada."""
+        return os.path.abspath(self.image_path), os.path.getmtime(self.image_path)
+
+    def _get_cache_file(self, key: Tuple[str, float]) -> str:
+        """Ruta del archivo de caché asociado a la imagen y la configuración del análisis."""
+        analyzer = self._components_analyzer
+        identity = f"v{CACHE_VERSION}|{key[0]}|{analyzer.min_area}|{analyzer.backend}"
+        digest = hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"ref_{digest}.npz")
+
+    def _load_cached_analysis(self, key: Tuple[str, float]) -> bool:
+        """
+        Recupera un análisis previo de la misma imagen si sigue vigente.
+
+        Args:
+            key: Clave (ruta, fecha de modificación) de la imagen
+
+        Returns:
+            True si el análisis quedó disponible sin recalcularlo
+        """
+        if self._analysis_key == key:
+            return True
+        if self.cache_dir is None:
+            return False
+
+        try:
+            with np.load(self._get_cache_file(key)) as data:
+                if float(data['mtime']) != key[1]:
+                    return False
+                self._areas = data['areas']
+                self._reference_index = int(data['reference_index'])
+                self._reference_bbox = data['bbox']
+                self._reference_centroid = data['centroid']
+        except (OSError, KeyError, ValueError):
+            return False
+
+        self._analysis_key = key
+        return True
+
+    def _store_cached_analysis(self, key: Tuple[str, float]) -> None:
+        """Guarda el análisis actual en memoria y, si está habilitado, en disco."""
+        self._analysis_key = key
+        if self.cache_dir is None:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(
+                self._get_cache_file(key),
+                mtime=key[1],
+                areas=self._areas,
+                reference_index=self._reference_index,
+                bbox=self._reference_bbox,
+                centroid=self._reference_centroid
+            )
+        except OSError:
+            pass  # La caché en disco es opcional
 
     def _calculate_conversion_factor(self) -> None:
         """Calcula factor de conversión píxeles a cm²."""
         reference_area_cm = self.reference_width * self.reference_height
-        self._conversion_factor = reference_area_cm / self._reference_component.area
+        self._conversion_factor = reference_area_cm / self._areas[self._reference_index]
 
     def _calculate_total_areas(self) -> None:
         """Calcula áreas totales y dañadas."""
@@ -63,21 +141,21 @@ class StructuralHealthAnalyzer:
         self._total_wall_area = pixel_wall_area * self._conversion_factor
 
         # Filtrar regiones excluyendo la referencia
-        self._damaged_areas = [
-            r.area * self._conversion_factor
-            for r in self._regions
-            if r != self._reference_component
-        ]
+        areas_cm = self._areas * self._conversion_factor
+        self._damaged_areas = np.delete(areas_cm, self._reference_index)
     def _compute_health_metrics(self) -> tuple[float, float]:
         """Calcula métricas finales de salud."""
-        total_damaged = sum(self._damaged_areas)
+        total_damaged = float(self._damaged_areas.sum())
         wall_health = ((self._total_wall_area - total_damaged) / self._total_wall_area) * 100
         return total_damaged, wall_health
 
     def analyze(self) -> None:
         """Flujo principal de análisis optimizado."""
         self._load_wall_image()
-        self._execute_single_analysis()  # Análisis único
+        key = self._get_analysis_key()
+        if not self._load_cached_analysis(key):
+            self._execute_single_analysis()  # Análisis único
+            self._store_cached_analysis(key)
         self._calculate_conversion_factor()
         self._calculate_total_areas()
         total_damaged, wall_health = self._compute_health_metrics()
@@ -5,10 +5,54 @@ Proporciona funcionalidad para fusionar resultados de diferentes detectores y vi
 la combinación resultante.
 """
 
-import matplotlib.pyplot as plt
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 import cv2
+import numpy as np
+import detector_grietas
 from detector_grietas import CrackDetectionPipeline
 from detector_referencia import WhiteRegionDetector
+from image_io import imread_cached
+from numba_compat import NUMBA_AVAILABLE, njit, prange
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _or_and_count(crack: np.ndarray, reference: np.ndarray, out: np.ndarray) -> int:
+    """
+    Combina dos máscaras con OR y cuenta los píxeles activos en una sola pasada.
+
+    Args:
+        crack: Máscara uint8 de grietas
+        reference: Máscara uint8 de referencia con la misma forma
+        out: Máscara uint8 de salida con la misma forma
+
+    Returns:
+        Número de píxeles distintos de cero en la máscara combinada
+    """
+    count = 0
+    for i in prange(crack.shape[0]):
+        for j in range(crack.shape[1]):
+            value = crack[i, j] | reference[i, j]
+            out[i, j] = value
+            count += value != 0
+    return count
+
+
+@functools.lru_cache(maxsize=8)
+def _run_crack(image_path: str, mtime: float) -> np.ndarray:
+    """Ejecuta el detector de grietas; la fecha de modificación invalida la caché."""
+    mask = CrackDetectionPipeline(image_path).execute()
+    mask.setflags(write=False)
+    return mask
+
+
+@functools.lru_cache(maxsize=8)
+def _run_reference(image_path: str, mtime: float) -> np.ndarray:
+    """Ejecuta el detector de referencia; la fecha de modificación invalida la caché."""
+    mask = WhiteRegionDetector(image_path).process()
+    mask.setflags(write=False)
+    return mask
 
 
 class MaskCombiner:
@@ -17,10 +61,14 @@ class MaskCombiner:
 
     Atributos:
         image_path (str): Ruta de la imagen a procesar
-        crack_mask (np.ndarray): Máscara binaria de grietas detectadas
-        reference_mask (np.ndarray): Máscara binaria de región de referencia
+        crack_mask (np.ndarray): Máscara binaria de grietas detectadas (solo lectura, compartida)
+        reference_mask (np.ndarray): Máscara binaria de región de referencia (solo lectura, compartida)
+        combined_area (int): Píxeles activos en la última máscara combinada sin empaquetar
     """
 
+    # Pool compartido entre instancias; el hilo se crea al primer uso
+    _executor = ThreadPoolExecutor(max_workers=1)
+
     def __init__(self, image_path: str):
         """
         Inicializa el combinador con la ruta de la imagen.
@@ -31,45 +79,102 @@ class MaskCombiner:
         self.image_path = image_path
         self.crack_mask = None
         self.reference_mask = None
+        self._combined = None
+        self.combined_area = None
+        self._packed_crack = None
+        self._packed_reference = None
+        self._packed_combined = None
 
     def _detect_cracks(self) -> None:
         """Ejecuta el detector de grietas y almacena su máscara resultante."""
-        crack_detector = CrackDetectionPipeline(self.image_path)
-        self.crack_mask = crack_detector.execute()
+        if self.crack_mask is not None:
+            return
+        self.crack_mask = _run_crack(self.image_path, os.path.getmtime(self.image_path))
 
     def _detect_reference(self) -> None:
         """Ejecuta el detector de referencia y almacena su máscara resultante."""
-        reference_extractor = WhiteRegionDetector(self.image_path)
-        self.reference_mask = reference_extractor.process()
+        if self.reference_mask is not None:
+            return
+        self.reference_mask = _run_reference(self.image_path, os.path.getmtime(self.image_path))
 
-    def combine_masks(self, show_combined: bool = False) -> cv2.Mat:
+    def combine_masks(self, show_combined: bool = False, packed: bool = False) -> np.ndarray:
         """
         Combina las máscaras mediante operación OR y opcionalmente muestra el resultado.
 
         Args:
             show_combined: Bandera para mostrar visualización de la máscara combinada
+            packed: Devuelve la máscara empaquetada a un bit por píxel (np.packbits por filas)
 
         Returns:
-            Matriz OpenCV con la máscara combinada
+            Máscara combinada; el búfer se reutiliza en llamadas posteriores
         """
+        # Calentar la caché de imágenes antes de repartir el trabajo: así ambos
+        # detectores leen el mismo arreglo en lugar de decodificar el JPEG dos veces
+        if self.crack_mask is None or self.reference_mask is None:
+            imread_cached(self.image_path, cv2.IMREAD_GRAYSCALE)
+
+        # Los detectores son independientes y OpenCV libera el GIL. El de grietas
+        # se queda en el hilo actual porque lanza núcleos paralelos de Numba, que
+        # no deben iniciarse desde hilos secundarios
+        reference_future = self._executor.submit(self._detect_reference)
         self._detect_cracks()
-        self._detect_reference()
+        reference_future.result()
 
-        combined = cv2.bitwise_or(self.crack_mask, self.reference_mask)
+        if packed:
+            return self._combine_packed(show_combined)
+
+        if self._combined is None or self._combined.shape != self.crack_mask.shape:
+            self._combined = np.empty_like(self.crack_mask)
+        if NUMBA_AVAILABLE:
+            self.combined_area = _or_and_count(self.crack_mask, self.reference_mask, self._combined)
+        else:
+            np.bitwise_or(self.crack_mask, self.reference_mask, out=self._combined)
+            self.combined_area = int(np.count_nonzero(self._combined))
 
         if show_combined:
-            self._display_combined_mask(combined)
+            self._display_combined_mask(self._combined)
+
+        return self._combined
 
-        return combined
+    def _combine_packed(self, show_combined: bool) -> np.ndarray:
+        """
+        Combina las máscaras empaquetadas a un bit por píxel.
+
+        Args:
+            show_combined: Bandera para mostrar visualización de la máscara combinada
+
+        Returns:
+            Máscara combinada empaquetada por filas
+        """
+        # Las máscaras de los detectores no cambian, así que se empaquetan una vez
+        if self._packed_crack is None:
+            self._packed_crack = np.packbits(self.crack_mask, axis=1)
+        if self._packed_reference is None:
+            self._packed_reference = np.packbits(self.reference_mask, axis=1)
+
+        if self._packed_combined is None or self._packed_combined.shape != self._packed_crack.shape:
+            self._packed_combined = np.empty_like(self._packed_crack)
+        np.bitwise_or(self._packed_crack, self._packed_reference, out=self._packed_combined)
+
+        if show_combined:
+            width = self.crack_mask.shape[1]
+            self._display_combined_mask(
+                np.unpackbits(self._packed_combined, axis=1, count=width) * np.uint8(255)
+            )
+
+        return self._packed_combined
 
     @staticmethod
-    def _display_combined_mask(mask: cv2.Mat) -> None:
+    def _display_combined_mask(mask: np.ndarray) -> None:
         """
         Muestra la máscara combinada usando matplotlib.
 
         Args:
             mask: Máscara binaria a visualizar
         """
+        # matplotlib solo se importa cuando se visualiza
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(10, 5))
         plt.imshow(mask, cmap='gray')
         plt.title('Regiones combinadas: grietas + hoja')
@@ -78,11 +183,22 @@ class MaskCombiner:
         plt.show()
 
 
+def warmup() -> None:
+    """Compila por adelantado los núcleos de Numba usados al combinar máscaras."""
+    detector_grietas.warmup()
+    if NUMBA_AVAILABLE:
+        # Las máscaras memorizadas de los detectores son de solo lectura
+        mask = np.zeros((32, 32), np.uint8)
+        mask.setflags(write=False)
+        _or_and_count(mask, mask, np.empty_like(mask))
+
+
 def main():
     """Función principal para demostración del módulo."""
+    warmup()
     combiner = MaskCombiner('imagenes/img_1.jpg')
     _ = combiner.combine_masks(show_combined=True)
 
 
-if __name__ == '_main_':
+if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Módulo de compatibilidad con Numba.
+
+Numba es una dependencia opcional: cuando no está instalada se exponen versiones
+inertes de `njit` y `prange` y los módulos recurren a sus implementaciones
+basadas en OpenCV/NumPy.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Decorador sustituto que devuelve la función sin compilar."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func